@@ -0,0 +1,133 @@
+"""Startup benchmark, run from the repo root: python bench.py > bench_output.txt
+
+Times cold imports, the home page's cold run and the first "Go" click. The Go click
+runs against a throwaway Postgres seeded by loadtest.py (initdb/pg_ctl from PATH or
+--pg-bin, not as root) and is measured twice: right after the home page, and after
+the home page's warm-up thread has finished, as when a reviewer is still picking a date.
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+import loadtest
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+RUNS = 5
+
+# Each module is imported in a fresh interpreter so nothing is already loaded
+MODULES = ["streamlit", "pandas", "psycopg2", "day_data", "report___2", "overview"]
+
+IMPORT_CODE = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+# Home page run, optionally waiting for its warm-up thread, then a timed Go click
+GO_CODE = """
+import time, datetime, threading
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("page1.py", default_timeout=300)
+start = time.perf_counter()
+app.run()
+home = time.perf_counter() - start
+if {wait_for_warm_up}:
+    for thread in threading.enumerate():
+        if thread.name == "kant-warm-up":
+            thread.join()
+app.date_input[0].set_value(datetime.date.fromisoformat("{day}"))
+start = time.perf_counter()
+app.button[0].click().run()
+go = time.perf_counter() - start
+assert not app.exception and not app.error, "Go run showed an error"
+print(home, go)
+"""
+
+
+def run_python(code, env=None):
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return out.stdout.strip().splitlines()[-1]
+
+
+def last_error_line(e):
+    lines = e.stderr.strip().splitlines()
+    return lines[-1] if lines else f"exit code {e.returncode}"
+
+
+def bench_imports():
+    print(f"{'import':<24}{'median s':>10}{'min s':>10}")
+    for module in MODULES:
+        try:
+            times = [float(run_python(IMPORT_CODE.format(module=module))) for _ in range(RUNS)]
+        except subprocess.CalledProcessError as e:
+            print(f"{module:<24}{'failed':>10}  {last_error_line(e)}")
+            continue
+        print(f"{module:<24}{statistics.median(times):>10.3f}{min(times):>10.3f}")
+
+
+def bench_go(pg_bin):
+    workdir = tempfile.mkdtemp(prefix="kant-bench-")
+    try:
+        port, stop = loadtest.start_postgres(pg_bin, workdir, 100)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Go click: skipped, could not start Postgres ({e})")
+        shutil.rmtree(workdir, ignore_errors=True)
+        return
+
+    try:
+        import psycopg2
+        conn = psycopg2.connect(host="127.0.0.1", port=port, dbname="postgres", user="postgres")
+        loadtest.seed_database(conn, os.path.join(workdir, "photos"), 1, 60, 8)
+        conn.close()
+
+        print(f"{'run':<24}{'home s':>10}{'go s':>10}   (median of {RUNS})")
+        for label, wait_for_warm_up in (("go right after home", False), ("go after warm-up", True)):
+            results = []
+            for i in range(RUNS):
+                image_port = loadtest.free_port()
+                env = dict(os.environ)
+                env.update({
+                    "DB_HOST": "127.0.0.1",
+                    "DB_PORT": str(port),
+                    "DB_NAME": "postgres",
+                    "DB_USER": "postgres",
+                    "DB_PASS": "",
+                    # A fresh shared cache per run, otherwise only the first run would be cold
+                    "KANT_CACHE_URL": "sqlite:///" + os.path.join(workdir, f"cache-{label}-{i}.sqlite3"),
+                    # Tiles link to the image server as in production, not inlined
+                    "IMAGE_SERVER_PORT": str(image_port),
+                    "IMAGE_SERVER_URL": f"http://127.0.0.1:{image_port}",
+                })
+                code = GO_CODE.format(wait_for_warm_up=wait_for_warm_up, day=loadtest.FIRST_DAY)
+                try:
+                    results.append([float(t) for t in run_python(code, env).split()])
+                except subprocess.CalledProcessError as e:
+                    print(f"{label:<24}{'failed':>10}  {last_error_line(e)}")
+                    break
+            else:
+                home = statistics.median(r[0] for r in results)
+                go = statistics.median(r[1] for r in results)
+                print(f"{label:<24}{home:>10.3f}{go:>10.3f}")
+    finally:
+        stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pg-bin", default=os.getenv("PG_BIN"), help="directory holding initdb and pg_ctl")
+    args = parser.parse_args()
+
+    bench_imports()
+    print()
+    bench_go(args.pg_bin)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import pandas as pd
+
+
+# Columns the report actually reads from kant.form_response_data
+DAY_COLUMNS = [
+    "School ID",
+    "Timestamp",
+    "Class",
+    "Section",
+    "uploaded_by",
+    "Class_pic",
+    "Film 1",
+    "Film 2",
+    "Film 3",
+]
+
+# Repeated text fields stored as categories instead of python strings. "Class_pic" is
+# nearly unique per row, a category would only add codes on top of the strings.
+CATEGORY_COLUMNS = ["School ID", "Class", "Section", "uploaded_by", "Film 1", "Film 2", "Film 3"]
+
+FILM_FIELDS = ["Film 1", "Film 2", "Film 3"]
+
+# Parsed film numbers (Int64), <NA> where the field is empty or not a number
+FILM_NUMBER_COLUMNS = ["film_1", "film_2", "film_3"]
+
+
+def day_query():
+    columns = ", ".join(f'"{col}"' for col in DAY_COLUMNS)
+    return f"""
+        SELECT {columns} FROM kant.form_response_data
+        WHERE DATE("Timestamp") = %s
+        ORDER BY "School ID", "Timestamp"
+    """
+
+
+def parse_film_numbers(values):
+    """ Parses raw film values into a nullable integer array """
+    numbers = pd.to_numeric(values.astype(str).str.strip(), errors="coerce")
+    # Anything that is not a whole number, or too large even for int64, becomes <NA>
+    whole = (numbers % 1 == 0) & (numbers.abs() < 2**63)
+    return numbers.where(whole).astype("Int64")
+
+
+def compact_day_frame(df):
+    """ Shrinks a raw day frame to categorical/integer dtypes, one row per school/class/section, indexed by school """
+    df = df.reindex(columns=DAY_COLUMNS)
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+    df = df.sort_values(by=["School ID", "Timestamp"], kind="stable")
+    df = df.drop_duplicates(subset=["School ID", "Class", "Section"], keep="first")
+
+    for film_field, number_col in zip(FILM_FIELDS, FILM_NUMBER_COLUMNS):
+        df[number_col] = parse_film_numbers(df[film_field])
+
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype("category")
+
+    return df.set_index("School ID")
+
+
+def empty_day_frame():
+    return compact_day_frame(pd.DataFrame(columns=DAY_COLUMNS))
+
+
+def school_frame(day, school_id):
+    """ Rows of one school from the shared day frame, ordered by timestamp """
+    if school_id not in day.index:
+        return pd.DataFrame()
+    return day.loc[[school_id]].reset_index()
+
+
+def school_ids(day):
+    """ School IDs present in the day frame, in ascending order """
+    return list(day.index.unique().sort_values())
+
+
+def memory_report(day):
+    """ Per-column memory usage of a day frame in KB """
+    usage = day.memory_usage(deep=True)
+    report = pd.DataFrame({
+        "dtype": [str(day.index.dtype) if col == "Index" else str(day[col].dtype) for col in usage.index],
+        "KB": (usage / 1024).round(2),
+    })
+    report.loc["Total"] = ["", round(usage.sum() / 1024, 2)]
+    return report
+
+
+def cache_memory_report(days):
+    """ Rows and memory in KB of every cached day frame, keyed by date """
+    report = pd.DataFrame(
+        {
+            "rows": [len(day) for day in days.values()],
+            "KB": [round(day.memory_usage(deep=True).sum() / 1024, 2) for day in days.values()],
+        },
+        index=[str(date) for date in days],
+    ).sort_index()
+    report.loc["Total"] = [report["rows"].sum(), round(report["KB"].sum(), 2)]
+    return report
@@ -0,0 +1,290 @@
+import io
+import os
+import time
+import mmap
+import base64
+import datetime
+import threading
+import mimetypes
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import shared_cache
+
+
+# Where the image server listens, and the address browsers use to reach it. The server
+# has no login of its own, so it only listens locally: publish it through the same
+# proxy as the app and set IMAGE_SERVER_URL to that address (e.g. https://host/images).
+# Without IMAGE_SERVER_URL the server is not started, the report says so and inlines thumbnails.
+IMAGE_SERVER_HOST = os.getenv("IMAGE_SERVER_HOST", "127.0.0.1")
+IMAGE_SERVER_PORT = int(os.getenv("IMAGE_SERVER_PORT", "8502"))
+IMAGE_SERVER_URL = os.getenv("IMAGE_SERVER_URL", "").rstrip("/")
+
+THUMBNAIL_SIZE = (600, 400)  # Twice the 300x200 gallery tile, sharp on high-DPI screens
+THUMBNAIL_TTL = 24 * 60 * 60
+CACHE_MAX_AGE = 24 * 60 * 60  # Seconds browsers may reuse an image without asking again
+CHUNK_SIZE = 256 * 1024
+
+# Only one replica per host binds the port, so the paths it may serve are shared per date
+ALLOWLIST_TTL = 24 * 60 * 60
+ALLOWLIST_REFRESH = 5  # Seconds before an unknown path makes this process read the shared allowlist again
+MAX_ALLOWLIST_DAYS = 31
+
+MISSING_TTL = 60  # Seconds an unknown path is answered with 404 without asking the database
+MAX_MISSING = 10000
+LOOKUP_SLOTS = 2  # Pool connections unknown paths may hold at once, the report needs the rest
+LOOKUP_WAIT = 5  # Seconds a request waits for a slot before getting a 404
+
+
+# Local copies of the shared allowlists, date -> (read at, "Class_pic" values), and recent misses
+allowlists = {}
+missing = {}
+referenced_lock = threading.Lock()
+lookup_slots = threading.BoundedSemaphore(LOOKUP_SLOTS)
+
+
+def allow(day, class_pics):
+    """ Publishes the paths the report read for a date, for whichever replica serves the images """
+    paths = frozenset(class_pics)
+    shared_cache.put("image_allowlist", (str(day),), paths, ALLOWLIST_TTL)
+    remember(str(day), paths)
+
+
+def remember(day, paths):
+    with referenced_lock:
+        allowlists.pop(day, None)
+        if len(allowlists) >= MAX_ALLOWLIST_DAYS:
+            del allowlists[next(iter(allowlists))]  # Least recently read date first
+        allowlists[day] = (time.monotonic(), paths)
+
+
+def is_referenced(day, class_pic):
+    now = time.monotonic()
+    with referenced_lock:
+        read_at, paths = allowlists.get(day, (0, frozenset()))
+        if class_pic in paths:
+            return True
+        if missing.get((day, class_pic), 0) > now:
+            return False
+
+    # Another replica may have loaded this date since we last looked
+    if now - read_at > ALLOWLIST_REFRESH:
+        paths = shared_cache.peek("image_allowlist", (day,)) or frozenset()
+        remember(day, paths)
+        if class_pic in paths:
+            return True
+
+    if not lookup_slots.acquire(timeout=LOOKUP_WAIT):
+        return False
+    try:
+        found = query_referenced(day, class_pic)
+    finally:
+        lookup_slots.release()
+
+    if found:
+        remember(day, paths | {class_pic})
+    elif found is not None:
+        with referenced_lock:
+            missing.pop((day, class_pic), None)
+            if len(missing) >= MAX_MISSING:
+                del missing[next(iter(missing))]  # Oldest miss first
+            missing[(day, class_pic)] = time.monotonic() + MISSING_TTL
+    return bool(found)
+
+
+def query_referenced(day, class_pic):
+    """ True or False, None when the database could not be asked """
+    import report___2
+    start = datetime.date.fromisoformat(day)
+    conn = report___2.get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor()
+        # The "Timestamp" range keeps the lookup on that column's index
+        cursor.execute(
+            'SELECT 1 FROM kant.form_response_data WHERE "Timestamp" >= %s AND "Timestamp" < %s AND "Class_pic" = %s LIMIT 1',
+            (start, start + datetime.timedelta(days=1), class_pic),
+        )
+        found = cursor.fetchone() is not None
+        cursor.close()
+    finally:
+        report___2.release_db_connection(conn)
+    return found
+
+
+def local_path(class_pic):
+    # Same normalisation the report applies before showing a picture
+    return os.path.abspath(os.path.normpath(class_pic.strip()))
+
+
+def image_urls(day, class_pic):
+    """ (thumbnail URL, original URL) for a "Class_pic" value of a date, the original is None without IMAGE_SERVER_URL """
+    if not IMAGE_SERVER_URL:
+        # Nothing the browser could reach, send the thumbnail over the app's own connection
+        path = local_path(class_pic)
+        stat = os.stat(path)
+        try:
+            body = make_thumbnail(path, stat.st_mtime_ns, stat.st_size)
+        except Exception:
+            return "", None
+        return "data:image/jpeg;base64," + base64.b64encode(body).decode(), None
+
+    query = urllib.parse.urlencode({"day": str(day), "path": class_pic})
+    return f"{IMAGE_SERVER_URL}/thumb?{query}", f"{IMAGE_SERVER_URL}/original?{query}"
+
+
+# Size and mtime are part of the key so a replaced file gets a new thumbnail
+@shared_cache.shared_cache("thumbnails", THUMBNAIL_TTL)
+def make_thumbnail(path, mtime_ns, size):
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as image:
+        # Let the JPEG decoder scale down while decoding instead of decoding every pixel
+        image.draft("RGB", THUMBNAIL_SIZE)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(THUMBNAIL_SIZE)
+        out = io.BytesIO()
+        image.convert("RGB").save(out, "JPEG", quality=80)
+        return out.getvalue()
+
+
+def parse_day(value):
+    """ "YYYY-MM-DD" of a date parameter, None when it is not a date """
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        return None
+
+
+def parse_range(header, size):
+    """ (start, end) of a single "bytes=" range, None to send the whole file, "invalid" if unsatisfiable """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None  # Multiple ranges are optional, the whole file is a valid answer
+
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0:
+                return "invalid"
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or end < start:
+        return "invalid"
+    return start, min(end, size - 1)
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.handle_image(send_body=False)
+
+    def do_GET(self):
+        self.handle_image(send_body=True)
+
+    def log_message(self, format, *args):
+        pass  # One line per tile would drown the Streamlit log
+
+    def handle_image(self, send_body):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        day = parse_day(query.get("day", [""])[0])
+        class_pic = query.get("path", [None])[0]
+        if url.path not in ("/original", "/thumb") or not class_pic or not day:
+            return self.send_status(404)
+
+        path = local_path(class_pic)
+        if not is_referenced(day, class_pic) or not os.path.isfile(path):
+            return self.send_status(404)
+
+        stat = os.stat(path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        if url.path == "/thumb":
+            etag = etag[:-1] + '-t"'
+        if self.matches(self.headers.get("If-None-Match"), etag):
+            return self.send_status(304, etag)
+
+        if url.path == "/thumb":
+            try:
+                body = make_thumbnail(path, stat.st_mtime_ns, stat.st_size)
+            except Exception:
+                return self.send_status(415)
+            self.send_response(200)
+            self.send_image_headers("image/jpeg", len(body), etag)
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+            return
+
+        self.send_original(path, stat.st_size, etag, send_body)
+
+    def send_original(self, path, size, etag, send_body):
+        span = None
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range", etag) == etag:
+            span = parse_range(range_header, size)
+        if span == "invalid":
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start, end = span if span else (0, size - 1)
+        content_type = mimetypes.guess_type(path)[0] or "image/jpeg"
+        self.send_response(206 if span else 200)
+        self.send_image_headers(content_type, end - start + 1, etag)
+        if span:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        # Empty files cannot be mapped, and HEAD has no body
+        if not send_body or size == 0:
+            return
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                for offset in range(start, end + 1, CHUNK_SIZE):
+                    self.wfile.write(view[offset:min(offset + CHUNK_SIZE, end + 1)])
+
+    def send_image_headers(self, content_type, length, etag):
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", f"private, max-age={CACHE_MAX_AGE}")
+
+    def send_status(self, code, etag=None):
+        self.send_response(code)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", f"private, max-age={CACHE_MAX_AGE}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    @staticmethod
+    def matches(if_none_match, etag):
+        if not if_none_match:
+            return False
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+
+def start(host=IMAGE_SERVER_HOST, port=IMAGE_SERVER_PORT):
+    """ Serves images on a daemon thread, raises OSError when the port is taken """
+    server = ThreadingHTTPServer((host, port), ImageHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    server = start()
+    print(f"Serving images on {IMAGE_SERVER_HOST}:{IMAGE_SERVER_PORT}")
+    threading.Event().wait()
@@ -0,0 +1,418 @@
+"""Concurrent-reviewer load test.
+
+Starts a throwaway Postgres (initdb/pg_ctl from PATH or --pg-bin), seeds it with
+synthetic days and photos, runs `streamlit run page1.py` against it and drives the
+page1.py -> report___2.show() flow for N simulated reviewers per concurrency level.
+Each reviewer is a scripted client on the app's websocket, so all sessions share one
+server like they do in production. By default every reviewer reviews its own cold
+date, so each level loads as many days at once as it has reviewers (--shared-date
+makes them share one). After every step the reviewer fetches the page's thumbnails
+from the image server like a browser, inside the timed step. Reports the first "Go"
+load separately from NEXT page-turn latency percentiles, plus images fetched, errors,
+peak DB connections, and the server's CPU and RSS.
+
+    python loadtest.py --reviewers 1,2,4,8,16 --turns 10 > bench_output.txt
+
+Postgres refuses to run as root, run this as a regular user.
+"""
+import os
+import re
+import sys
+import time
+import random
+import shutil
+import socket
+import argparse
+import datetime
+import tempfile
+import urllib.request
+import threading
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+FIRST_DAY = datetime.date(2025, 3, 3)
+UPLOADERS = ["Usha Kumari", "Ravi Gujjar", "R. Sanwat", "Seema Gaur", "Anil Meena", "Pooja Sharma"]
+SECTIONS = ["A", "B", "C"]
+
+PHOTO_SIZE = (1600, 1200)  # Phone-sized, so a thumbnail costs a real decode
+PHOTO_VARIANTS = 16
+
+IMAGE_CONNECTIONS = 6  # Parallel image requests per reviewer, as a browser opens per host
+IMG_SRC = re.compile(r'<img src="([^"]+)"')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_postgres(pg_bin, workdir, max_connections):
+    """ Initialises and starts a local cluster, returns (port, stop function) """
+    data_dir = os.path.join(workdir, "pgdata")
+    port = free_port()
+    tool = lambda name: os.path.join(pg_bin, name) if pg_bin else name
+
+    subprocess.run([tool("initdb"), "-D", data_dir, "-U", "postgres", "-A", "trust"],
+                   check=True, capture_output=True)
+    options = f"-p {port} -k {workdir} -c listen_addresses=127.0.0.1 -c max_connections={max_connections}"
+    subprocess.run([tool("pg_ctl"), "-D", data_dir, "-o", options, "-l", os.path.join(workdir, "pg.log"), "-w", "start"],
+                   check=True, capture_output=True)
+
+    def stop():
+        subprocess.run([tool("pg_ctl"), "-D", data_dir, "-m", "fast", "stop"], capture_output=True)
+
+    return port, stop
+
+
+def write_photo(path, seed):
+    """ Textured JPEG when Pillow is around (it comes with Streamlit), random bytes otherwise """
+    try:
+        from PIL import Image
+        color = ((seed * 37) % 256, (seed * 91) % 256, (seed * 53) % 256)
+        noise = Image.effect_noise((PHOTO_SIZE[0] // 8, PHOTO_SIZE[1] // 8), 48).convert("RGB")
+        image = Image.blend(Image.new("RGB", noise.size, color), noise, 0.5).resize(PHOTO_SIZE, Image.BICUBIC)
+        image.save(path, "JPEG", quality=90)
+    except ImportError:
+        with open(path, "wb") as f:
+            f.write(os.urandom(300_000))
+
+
+def write_variants(photo_dir):
+    """ A few photos every seeded row links to, each path still gets its own thumbnail """
+    variant_dir = os.path.join(photo_dir, "variants")
+    os.makedirs(variant_dir)
+    paths = [os.path.join(variant_dir, f"{seed}.jpg") for seed in range(PHOTO_VARIANTS)]
+    for seed, path in enumerate(paths):
+        write_photo(path, seed)
+    return paths
+
+
+def photo_name(day, moment, uploader, rng):
+    """ Mixes the filename patterns the report recognises, including live and mismatched-date pictures """
+    kind = rng.random()
+    if kind < 0.4:
+        return f"image - {rng.randrange(10**25, 10**26)}.jpg"
+    if kind < 0.5:
+        return f"Screenshot_{moment:%Y%m%d_%H%M%S}.jpg"
+    stamp = moment if kind < 0.9 else moment - datetime.timedelta(days=2)
+    return f"IMG_{stamp:%Y%m%d_%H%M%S} - {uploader}.jpg"
+
+
+def seed_database(conn, photo_dir, days, schools, photos_per_school):
+    rng = random.Random(42)
+    cursor = conn.cursor()
+    cursor.execute("CREATE SCHEMA IF NOT EXISTS kant")
+    cursor.execute("""
+        CREATE TABLE kant.form_response_data (
+            "School ID" TEXT, "Timestamp" TIMESTAMP, "Class" TEXT, "Section" TEXT,
+            uploaded_by TEXT, "Class_pic" TEXT, "Film 1" TEXT, "Film 2" TEXT, "Film 3" TEXT
+        )
+    """)
+    cursor.execute('CREATE INDEX ON kant.form_response_data ("Timestamp")')
+    cursor.execute('CREATE TABLE kant.doe_school_list ("SCHOOL ID" TEXT, "SCHOOL" TEXT)')
+    cursor.executemany(
+        'INSERT INTO kant.doe_school_list VALUES (%s, %s)',
+        [(str(1000 + s), f"Govt. School No. {s}") for s in range(schools)],
+    )
+
+    variants = write_variants(photo_dir)
+    rows = []
+    for d in range(days):
+        day = FIRST_DAY + datetime.timedelta(days=d)
+        for s in range(schools):
+            moment = datetime.datetime.combine(day, datetime.time(8)) + datetime.timedelta(minutes=rng.randrange(240))
+            for p in range(photos_per_school):
+                moment += datetime.timedelta(minutes=rng.choice([2, 5, 12, 30]))
+                uploader = rng.choice(UPLOADERS)
+                path = os.path.join(photo_dir, f"{day:%Y%m%d}-{s}-{p}", photo_name(day, moment, uploader, rng))
+                os.makedirs(os.path.dirname(path))
+                try:
+                    os.link(variants[len(rows) % PHOTO_VARIANTS], path)
+                except OSError:
+                    shutil.copyfile(variants[len(rows) % PHOTO_VARIANTS], path)
+                cls = rng.randrange(1, 9)
+                films = [str(cls * 10 + rng.randrange(0, 10)) for _ in range(3)]
+                rows.append((str(1000 + s), moment, str(cls), SECTIONS[p % len(SECTIONS)], uploader, path, *films))
+
+    cursor.executemany("INSERT INTO kant.form_response_data VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)", rows)
+    conn.commit()
+    cursor.close()
+
+
+def start_app(port, env):
+    """ Runs page1.py headless and waits until the server answers its health check """
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "page1.py",
+         "--server.headless", "true", "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("streamlit did not start")
+
+
+def process_cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def process_rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class Sampler:
+    """ Samples DB connections and the server's RSS in the background """
+
+    def __init__(self, dsn, pid, interval=0.1):
+        import psycopg2
+        self.conn = psycopg2.connect(dsn)
+        self.conn.autocommit = True
+        self.pid = pid
+        self.interval = interval
+        self.max_connections = 0
+        self.max_rss_mb = 0.0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        cursor = self.conn.cursor()
+        while not self.stopped.is_set():
+            cursor.execute("SELECT count(*) FROM pg_stat_activity WHERE backend_type = 'client backend' AND pid <> pg_backend_pid()")
+            self.max_connections = max(self.max_connections, cursor.fetchone()[0])
+            self.max_rss_mb = max(self.max_rss_mb, process_rss_mb(self.pid))
+            self.stopped.wait(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        self.conn.close()
+
+
+class ReviewerClient:
+    """ Speaks the browser's side of the Streamlit websocket protocol """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.widget_ids = {}  # widget label -> id, learnt from the rendered page
+        self.image_urls = []  # <img> sources of the last finished run
+
+    def rerun(self, *widget_states):
+        """ Reruns the script with the given widget states, returns the number of errors shown """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.widget_states.widgets.extend(widget_states)
+        self.ws.send(msg.SerializeToString())
+        return self.wait_for_script()
+
+    def wait_for_script(self):
+        from streamlit.proto.Alert_pb2 import Alert
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        errors, image_urls = 0, []
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(self.ws.recv(timeout=300))
+            kind = msg.WhichOneof("type")
+
+            if kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type in ("button", "date_input"):
+                    widget = getattr(element, element_type)
+                    self.widget_ids[widget.label] = widget.id
+                elif element_type == "markdown":
+                    image_urls += IMG_SRC.findall(element.markdown.body)
+                elif element_type == "exception" or (element_type == "alert" and element.alert.format == Alert.ERROR):
+                    errors += 1
+
+            # st.rerun() ends a run early and starts another one, wait for the last
+            elif kind == "script_finished":
+                if msg.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    image_urls = []  # The browser never shows the tiles of a run that was cut short
+                else:
+                    self.image_urls = image_urls
+                    return errors
+
+    def click(self, label, *widget_states):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        return self.rerun(WidgetState(id=self.widget_ids[label], trigger_value=True), *widget_states)
+
+    def pick_date(self, day):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        state = WidgetState(id=self.widget_ids["Select Date"])
+        state.string_array_value.data.append(f"{day:%Y/%m/%d}")
+        return state
+
+
+def fetch_image(url):
+    """ Downloads one image, returns 1 when it failed """
+    try:
+        with urllib.request.urlopen(url, timeout=60) as response:
+            response.read()
+        return 0
+    except OSError:
+        return 1
+
+
+def fetch_images(urls):
+    """ Fetches a page's tiles, returns the number that failed """
+    with ThreadPoolExecutor(max_workers=IMAGE_CONNECTIONS) as executor:
+        return sum(executor.map(fetch_image, urls))
+
+
+def review_session(port, day, turns, results, lock):
+    """ One reviewer: pick the date, press Go, then page through schools with NEXT, loading every tile """
+    from websockets.sync.client import connect
+
+    with connect(f"ws://127.0.0.1:{port}/_stcore/stream", max_size=None, open_timeout=60) as ws:
+        client = ReviewerClient(ws)
+        client.rerun()
+        steps = [("go", lambda: client.click("Go", client.pick_date(day)))]
+        steps += [("turn", lambda: client.click("NEXT"))] * turns
+        for kind, step in steps:
+            start, images = time.perf_counter(), []
+            try:
+                failed = step()
+                images = client.image_urls
+                failed += fetch_images(images)
+            except Exception:
+                failed = 1
+            elapsed = time.perf_counter() - start
+            with lock:
+                results[kind].append(elapsed)
+                results["errors"].append(failed)
+                results["images"] += len(images)
+
+
+def percentiles(latencies):
+    """ (p50, p95, p99) of a latency list """
+    if len(latencies) < 2:
+        return tuple(latencies * 3) or (float("nan"),) * 3
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def run_level(days, turns, port, dsn, server_pid):
+    """ Runs one reviewer per entry of `days` at the same time """
+    results, lock = {"go": [], "turn": [], "errors": [], "images": 0}, threading.Lock()
+    threads = [
+        threading.Thread(target=review_session, args=(port, day, turns, results, lock))
+        for day in days
+    ]
+
+    cpu_start, wall_start = process_cpu_seconds(server_pid), time.perf_counter()
+    with Sampler(dsn, server_pid) as sampler:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.perf_counter() - wall_start
+
+    go_p50, _, _ = percentiles(results["go"])
+    p50, p95, p99 = percentiles(results["turn"])
+    return {
+        "reviewers": len(days),
+        "go_p50": go_p50,
+        "go_max": max(results["go"], default=float("nan")),
+        "turns": len(results["turn"]),
+        "p50": p50,
+        "p95": p95,
+        "p99": p99,
+        "max": max(results["turn"], default=float("nan")),
+        "images": results["images"],
+        "errors": sum(1 for e in results["errors"] if e),
+        "db_conns": sampler.max_connections,
+        "cpu": (process_cpu_seconds(server_pid) - cpu_start) / wall,
+        "rss_mb": sampler.max_rss_mb,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reviewers", default="1,2,4,8,16", help="comma separated concurrency levels")
+    parser.add_argument("--turns", type=int, default=10, help="NEXT clicks per reviewer after Go")
+    parser.add_argument("--schools", type=int, default=60, help="schools per synthetic day")
+    parser.add_argument("--photos", type=int, default=8, help="photos per school and day")
+    parser.add_argument("--max-connections", type=int, default=100, help="Postgres max_connections")
+    parser.add_argument("--pg-bin", default=os.getenv("PG_BIN"), help="directory holding initdb and pg_ctl")
+    parser.add_argument("--shared-date", action="store_true",
+                        help="all reviewers of a level review the same date (cache-hot) instead of one cold date each")
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.reviewers.split(",")]
+    workdir = tempfile.mkdtemp(prefix="kant-loadtest-")
+    port, stop = start_postgres(args.pg_bin, workdir, args.max_connections)
+    dsn = f"host=127.0.0.1 port={port} dbname=postgres user=postgres"
+
+    # Point the app at the stand-in
+    image_port = free_port()
+    env = dict(os.environ)
+    env.update({
+        "DB_HOST": "127.0.0.1",
+        "DB_PORT": str(port),
+        "DB_NAME": "postgres",
+        "DB_USER": "postgres",
+        "DB_PASS": "",
+        "KANT_CACHE_URL": "sqlite:///" + os.path.join(workdir, "cache.sqlite3"),
+        # Tiles link to the image server as in production, not inlined
+        "IMAGE_SERVER_PORT": str(image_port),
+        "IMAGE_SERVER_URL": f"http://127.0.0.1:{image_port}",
+    })
+
+    server = None
+    try:
+        import psycopg2
+        conn = psycopg2.connect(dsn)
+        # Every level starts from cold caches: one fresh date per level, or per reviewer by default
+        plan, next_day = [], 0
+        for reviewers in levels:
+            dates_needed = 1 if args.shared_date else reviewers
+            dates = [FIRST_DAY + datetime.timedelta(days=next_day + i) for i in range(dates_needed)]
+            plan.append([dates[i % dates_needed] for i in range(reviewers)])
+            next_day += dates_needed
+        seed_database(conn, os.path.join(workdir, "photos"), next_day, args.schools, args.photos)
+        conn.close()
+
+        app_port = free_port()
+        server = start_app(app_port, env)
+
+        # "go" is the cold first load of a date, the p-columns are NEXT page turns only, both include their tiles
+        header = (f"{'reviewers':>9} {'go p50':>7} {'go max':>7} {'turns':>6} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'max s':>7} "
+                  f"{'images':>6} {'errors':>6} {'db conns':>8} {'cpu':>5} {'rss MB':>7}")
+        print(header)
+        for days in plan:
+            r = run_level(days, args.turns, app_port, dsn, server.pid)
+            print(f"{r['reviewers']:>9} {r['go_p50']:>7.3f} {r['go_max']:>7.3f} {r['turns']:>6} {r['p50']:>7.3f} {r['p95']:>7.3f} "
+                  f"{r['p99']:>7.3f} {r['max']:>7.3f} {r['images']:>6} {r['errors']:>6} {r['db_conns']:>8} {r['cpu']:>5.2f} {r['rss_mb']:>7.1f}", flush=True)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
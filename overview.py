@@ -0,0 +1,121 @@
+import streamlit as st
+import pandas as pd
+import datetime
+
+import report___2
+import shared_cache
+
+
+# Seconds an overview stays cached, short enough to follow the day's uploads
+OVERVIEW_TTL = 5 * 60
+
+
+# One grouped query per date range: per-school and per-uploader rows come back together,
+# told apart by GROUPING(school_id). Gaps and repeated uploaders are computed per school and day.
+OVERVIEW_QUERY = """
+    WITH uploads AS (
+        SELECT
+            DATE("Timestamp") AS day,
+            "School ID" AS school_id,
+            uploaded_by,
+            CONCAT_WS('', "Class", "Section") AS class_section,
+            "Class" AS class,
+            EXTRACT(EPOCH FROM "Timestamp" - LAG("Timestamp") OVER w) / 60 AS gap_minutes,
+            uploaded_by = LAG(uploaded_by) OVER w AS same_uploader
+        FROM kant.form_response_data
+        WHERE "Timestamp" >= %s AND "Timestamp" < %s
+        WINDOW w AS (PARTITION BY "School ID", DATE("Timestamp") ORDER BY "Timestamp")
+    )
+    SELECT
+        GROUPING(school_id) = 1 AS by_uploader,
+        day,
+        school_id,
+        uploaded_by,
+        COUNT(*) AS photos,
+        COUNT(DISTINCT school_id) AS schools,
+        COUNT(DISTINCT class) AS classes,
+        COUNT(DISTINCT class_section) AS class_sections,
+        ROUND(MIN(gap_minutes)::numeric, 2) AS min_gap_minutes,
+        COUNT(*) FILTER (WHERE same_uploader) AS repeated_uploads
+    FROM uploads
+    GROUP BY GROUPING SETS ((day, school_id), (day, uploaded_by))
+    ORDER BY day, school_id, uploaded_by
+"""
+
+
+@shared_cache.shared_cache("overview", OVERVIEW_TTL)
+def load_overview(start_date, end_date):
+    conn = report___2.get_db_connection()
+    if not conn:
+        raise ConnectionError("no database connection")
+    try:
+        df = pd.read_sql(OVERVIEW_QUERY, conn, params=(start_date, end_date + datetime.timedelta(days=1)))
+    finally:
+        report___2.release_db_connection(conn)
+    df["min_gap_minutes"] = df["min_gap_minutes"].astype(float)
+    return df
+
+
+# Errors are raised so st.cache_resource does not keep them
+@st.cache_resource(ttl=OVERVIEW_TTL)
+def split_overview(start_date, end_date):
+    """ Returns (per-school, per-uploader) aggregates for the date range """
+    df = load_overview(start_date, end_date)
+    schools = df[~df["by_uploader"]].drop(columns=["by_uploader", "uploaded_by", "schools"])
+    uploaders = df[df["by_uploader"]].drop(columns=["by_uploader", "school_id"])
+    return schools.reset_index(drop=True), uploaders.reset_index(drop=True)
+
+
+def fetch_overview(start_date, end_date):
+    try:
+        return split_overview(start_date, end_date)
+    except Exception as e:
+        st.error(f"Error fetching overview: {e}")
+        return pd.DataFrame(), pd.DataFrame()
+
+
+def show():
+    st.title("📅 Daily Overview")
+
+    today = datetime.date.today()
+    date_range = st.date_input("Date range", value=(today - datetime.timedelta(days=6), today))
+    if len(date_range) != 2:
+        st.info("Select an end date.")
+        return
+    start_date, end_date = date_range
+
+    schools, uploaders = fetch_overview(start_date, end_date)
+    if schools.empty:
+        st.warning("No uploads found for the selected dates.")
+        return
+
+    days = schools.groupby("day").agg(
+        schools=("school_id", "nunique"),
+        photos=("photos", "sum"),
+        min_gap_minutes=("min_gap_minutes", "min"),
+        repeated_uploads=("repeated_uploads", "sum"),
+    )
+    st.write("##### Days")
+    st.dataframe(days, width="stretch")
+
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        st.write("##### Schools")
+        st.dataframe(schools, width="stretch", hide_index=True)
+    with col2:
+        st.write("##### Uploaders")
+        st.dataframe(uploaders, width="stretch", hide_index=True)
+
+    # Drill down: the chosen school's rows from the report's cached day frame, images only in the report
+    st.write("##### Drill down")
+    choices = list(schools[["day", "school_id"]].itertuples(index=False, name=None))
+    choice = st.selectbox("School", choices, format_func=lambda c: f"{c[0]} | {c[1]}")
+    if choice:
+        day, school_id = choice
+        st.dataframe(report___2.fetch_data(school_id, day), width="stretch", hide_index=True)
+
+        if st.button("Open in report"):
+            st.session_state.selected_date = day
+            st.session_state.focus_school_id = school_id
+            st.session_state.page = "report___2"
+            st.rerun()
@@ -34,9 +34,23 @@
 
 
 import streamlit as st
+import threading
 
 st.set_page_config(layout="wide")
 
+
+# Import the report (pandas, psycopg2), open the DB pool and load school names
+# in the background while the user is still picking a date. Runs once per process.
+@st.cache_resource
+def start_warm_up():
+    def warm_up():
+        import report___2
+        report___2.warm_up()
+
+    thread = threading.Thread(target=warm_up, name="kant-warm-up", daemon=True)
+    thread.start()
+    return thread
+
 # Initialize session state for navigation
 if "page" not in st.session_state:
     st.session_state.page = "home"
@@ -52,16 +66,27 @@ def navigate_to(page):
 
 # Display content based on selected page
 if st.session_state.page == "home":
+    start_warm_up()
     st.title("📊 Kant Daily Report")
 
     # Date Picker for selecting date
     selected_date = st.date_input("Select Date")  # User selects a date
     st.session_state.selected_date = selected_date  # Store selected date in session state
 
+    # Show the best school found so far while the rest of the day is still being ranked
+    st.session_state.progressive_ranking = st.checkbox(
+        "Progressive ranking",
+        value=st.session_state.get("progressive_ranking", True),
+        help="Start reviewing as soon as the first schools are scored",
+    )
+
     # Update page when button is clicked
     if st.button("Go"):
         navigate_to("report___2")
 
+    if st.button("Overview"):
+        navigate_to("overview")
+
 elif st.session_state.page == "report___2":
     # Redirect to report___2.py
     import report___2
@@ -70,3 +95,10 @@ elif st.session_state.page == "report___2":
     # Add a "Back" button to return to home
     if st.button("Back"):
         navigate_to("home")
+
+elif st.session_state.page == "overview":
+    import overview
+    overview.show()
+
+    if st.button("Back"):
+        navigate_to("home")
@@ -1,16 +1,23 @@
 import streamlit as st
-import psycopg2
 import pandas as pd
 import datetime
-import base64
 import os
+import functools
 from dotenv import load_dotenv
 import re
+import heapq
+import time
+import threading
+import weakref
 from concurrent.futures import ThreadPoolExecutor
+import day_data
+import shared_cache
+import image_server
 
 # st.set_page_config(layout="wide")
 
-st.markdown("""
+# Injected by show() on every run, Streamlit drops elements that a rerun does not emit again
+PAGE_CSS = """
     <style>
         .block-container {
             padding-top: 30px; 
@@ -19,127 +26,276 @@ st.markdown("""
     body {
             zoom: 90%
             font:14px}
-    </style>
-""", unsafe_allow_html=True)
-
 
-st.markdown(
-    """
-    <style>
         div[data-testid="stButton"] button {
             padding: 1px 5px !important; /* Adjust padding as needed */
             font-size: 30px !important;
         }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
-
 
-st.markdown(
-    """
-    <style>
         /* Reduce spacing between rows of images */
         div[data-testid="stImage"] {
             margin-bottom: 0px !important;
             padding-bottom: 0px !important;
         }
     </style>
-    """,
-    unsafe_allow_html=True,
-)
-
-load_dotenv()
-
-# Database connection details
-# DB_HOST = os.getenv("DB_HOST")
-# DB_NAME = os.getenv("DB_NAME")
-# DB_USER = os.getenv("DB_USER")
-# DB_PASS = os.getenv("DB_PASS")
-# DB_PORT = os.getenv("DB_PORT")
-
+"""
+
+
+# Database connection details, read once per process
+@functools.lru_cache(maxsize=None)
+def get_db_config():
+    load_dotenv()
+    return {
+        "host": os.getenv("DB_HOST", "2401:4900:1c63:189b:303f:f928:455d:b588"),
+        "dbname": os.getenv("DB_NAME", "postgres"),
+        "user": os.getenv("DB_USER", "postgres"),
+        "password": os.getenv("DB_PASS", "kant@123"),
+        "port": os.getenv("DB_PORT", "5432"),
+    }
 
-DB_HOST="2401:4900:1c63:189b:303f:f928:455d:b588"
-DB_NAME="postgres"
-DB_USER="postgres"
-DB_PASS="kant@123"
-DB_PORT="5432"
 
+# Connections shared by every session of this process
+@st.cache_resource
+def get_db_pool():
+    from psycopg2.pool import ThreadedConnectionPool
+    return ThreadedConnectionPool(1, int(os.getenv("DB_POOL_SIZE", "20")), **get_db_config())
 
 
-# Function to connect to PostgreSQL
+# Function to connect to PostgreSQL, hand the connection back with release_db_connection
 def get_db_connection():
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASS,
-            port=DB_PORT
-        )
-        return conn
+        return get_db_pool().getconn()
     except Exception as e:
         st.error(f"Database connection failed: {e}")
         return None
 
+
+def release_db_connection(conn):
+    get_db_pool().putconn(conn)
+
+
+# Number of schools scored together in progressive mode
+PROGRESSIVE_BATCH_SIZE = 8
+
+# Seconds entries stay in the cache shared by all app replicas
+RANKING_TTL = 10 * 60
+DAY_DATA_TTL = 10 * 60
+SCHOOL_NAME_TTL = 24 * 60 * 60
+
+
+# Seconds one replica may spend scoring a day before another one takes over
+RANKING_LOCK_TIMEOUT = RANKING_TTL
+
+
+# Fetch the distinct school IDs that uploaded on a specific date, raises on DB errors
+def fetch_school_ids(selected_date):
+    return day_data.school_ids(get_day_data(selected_date))
+
+
+def score_school(school_id, selected_date):
+    """ Returns the priority of one school, inf when it has no scorable images """
+    school_df = day_data.school_frame(get_day_data(selected_date), school_id)
+    return calculate_school_priority(school_df).get(school_id, float('inf'))
+
+
+# Rank every school of a date as (priority, position in school ID order, school ID), best first
+@shared_cache.shared_cache("rankings", RANKING_TTL, RANKING_LOCK_TIMEOUT)
+def rank_schools(selected_date):
+    school_ids = fetch_school_ids(selected_date)
+    return sorted((score_school(sid, selected_date), pos, sid) for pos, sid in enumerate(school_ids))
+
+
+# Errors are raised so st.cache_resource does not keep them
+@st.cache_resource(ttl=RANKING_TTL)
+def ranked_school_ids(selected_date):
+    return [sid for _, _, sid in rank_schools(selected_date)]
+
+
 # Fetch school IDs for a specific date
-@st.cache_resource
 def get_school_ids_for_date(selected_date):
-    conn = get_db_connection()
-    if conn:
+    try:
+        return ranked_school_ids(selected_date)
+    except Exception as e:
+        st.error(f"Error fetching School IDs: {e}")
+        return []
+
+
+class ProgressiveRanking:
+    """ Scores a day's schools in background batches, keeping a heap of the best ranked seen so far """
+
+    def __init__(self, selected_date, school_ids, batch_size=PROGRESSIVE_BATCH_SIZE, ranked=None):
+        self.selected_date = selected_date
+        self.school_ids = school_ids
+        self.total = len(school_ids)
+        self.batch_size = batch_size
+        self.heap = []  # (priority, position in school ID order, school ID)
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.first_ready = threading.Event()
+        self.done = False
+        self.failed_schools = []  # Schools whose scoring raised, ranked last
+        self.error = None  # Set when scoring stopped before every school was ranked
+
+        # Another replica already ranked this date, nothing left to score
+        if ranked is not None:
+            self.heap = list(ranked)
+            self.done = True
+            self.first_ready.set()
+            return
+
+        self.thread = threading.Thread(target=self._rank, daemon=True)
+        self.thread.start()
+
+    def _rank(self):
+        """ Scores the day while holding the shared lock, or follows the replica that holds it """
+        key = ("rankings", (self.selected_date,))
         try:
-            query = """
-                SELECT DISTINCT "School ID" FROM kant.form_response_data 
-                WHERE DATE("Timestamp") = %s
-                ORDER BY "School ID"
-            """
-            cursor = conn.cursor()
-            cursor.execute(query, (selected_date,))
-            school_ids = [row[0] for row in cursor.fetchall()]
-            cursor.close()
-            conn.close()
+            while True:
+                ranked = shared_cache.peek(*key)
+                if ranked is not None:
+                    self._merge(ranked)
+                    return
+                token = shared_cache.acquire(*key)
+                if token:
+                    break
+                # Show what the holder has scored so far instead of waiting for the whole day
+                self._merge(shared_cache.peek("rankings_partial", (self.selected_date,)) or [])
+                time.sleep(shared_cache.POLL_INTERVAL)
 
-            with ThreadPoolExecutor() as executor:
-                school_data = {sid: fetch_data(sid, selected_date) for sid in school_ids}
-            # priority_scores = {sid: calculate_school_priority(school_data[sid]) for sid in school_ids}
-            priority_scores = {sid: list(calculate_school_priority(school_data[sid]).values())[0] for sid in school_ids}
+            try:
+                # The holder may have published the ranking just before its lock went to us
+                ranked = shared_cache.peek(*key)
+                if ranked is not None:
+                    self._merge(ranked)
+                    return
+                self._score_batches()
+            finally:
+                shared_cache.release(*key, token)
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.changed:
+                self.done = True
+                self.changed.notify_all()
+            self.first_ready.set()
+
+    def _merge(self, ranked):
+        """ Takes over a ranking published by another replica when it covers more schools """
+        with self.changed:
+            if len(ranked) <= len(self.heap):
+                return
+            self.heap = list(ranked)  # Sorted, so already a heap
+            self.changed.notify_all()
+        self.first_ready.set()
+
+    def _score(self, school_id):
+        try:
+            return score_school(school_id, self.selected_date)
+        except Exception:
+            with self.lock:
+                self.failed_schools.append(school_id)
+            return float('inf')
+
+    def _score_batches(self):
+        # Schools a previous holder already published keep their scores
+        with self.lock:
+            scored = {sid for _, _, sid in self.heap}
+        pending = [(pos, sid) for pos, sid in enumerate(self.school_ids) if sid not in scored]
+
+        with ThreadPoolExecutor(max_workers=self.batch_size) as executor:
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                scores = list(executor.map(self._score, [sid for _, sid in batch]))
+
+                with self.changed:
+                    for (pos, sid), score in zip(batch, scores):
+                        heapq.heappush(self.heap, (score, pos, sid))
+                    self.changed.notify_all()
+                    partial = sorted(self.heap)
+
+                # Replicas waiting on our lock follow the same progress
+                if len(partial) < self.total:
+                    shared_cache.put("rankings_partial", (self.selected_date,), partial, RANKING_TTL)
+
+                # The best school of the first batch is good enough to start reviewing
+                self.first_ready.set()
+
+        # Only a ranking where every school was scored is worth sharing
+        if not self.failed_schools:
+            shared_cache.put("rankings", (self.selected_date,), sorted(self.heap), RANKING_TTL)
+
+    @property
+    def scored(self):
+        with self.lock:
+            return len(self.heap)
+
+    def wait_for_scored(self, count):
+        """ Blocks until `count` schools are scored or scoring has stopped """
+        with self.changed:
+            self.changed.wait_for(lambda: len(self.heap) >= count or self.done)
+
+    def navigation_order(self, order, frozen_index):
+        """ Merges newly scored schools into `order` without touching anything up to `frozen_index` """
+        frozen = list(order[:frozen_index + 1])
+        placed = set(frozen)
+        with self.lock:
+            ranked = heapq.nsmallest(len(self.heap), self.heap)
+        return frozen + [sid for _, _, sid in ranked if sid not in placed]
+
+
+# Start progressive ranking for a specific date (shared by all sessions)
+@st.cache_resource(ttl=RANKING_TTL)
+def get_progressive_ranking(selected_date):
+    ranked = shared_cache.peek("rankings", (selected_date,))
+    return ProgressiveRanking(selected_date, fetch_school_ids(selected_date), ranked=ranked)
+
+
+
+# Load the whole day in the compact day-data model, shared by all replicas
+@shared_cache.shared_cache("day_data", DAY_DATA_TTL)
+def load_day_data(selected_date):
+    conn = get_db_connection()
+    if not conn:
+        raise ConnectionError("no database connection")
+    try:
+        df = pd.read_sql(day_data.day_query(), conn, params=(selected_date,))
+    finally:
+        release_db_connection(conn)
+    return day_data.compact_day_frame(df)
 
 
-            sorted_school_ids = sorted(school_ids, key=lambda sid: priority_scores.get(sid, float('inf')))
+# Day frames get_day_data still holds in this process, for the memory report
+cached_days = weakref.WeakValueDictionary()
+cached_days_lock = threading.Lock()
 
-            return sorted_school_ids
 
-            # return school_ids
-        except Exception as e:
-            st.error(f"Error fetching School IDs: {e}")
-            return []
-    return []
+# Keep the whole day in this process (a month of days stays cached), errors are raised and not cached
+@st.cache_resource(max_entries=31, ttl=DAY_DATA_TTL)
+def get_day_data(selected_date):
+    day = load_day_data(selected_date)
+    with cached_days_lock:
+        cached_days[selected_date] = day
+    # These paths come straight from kant.form_response_data, whichever replica serves images may send them
+    image_server.allow(selected_date, day["Class_pic"].dropna())
+    return day
+
+
+def cached_day_frames():
+    with cached_days_lock:
+        return dict(cached_days)
 
 
+def fetch_day_data(selected_date):
+    try:
+        return get_day_data(selected_date)
+    except Exception as e:
+        st.error(f"Error fetching data: {e}")
+        return day_data.empty_day_frame()
+
 
 # Fetch data for a specific school ID and date
-@st.cache_resource
 def fetch_data(school_id, selected_date):
-    conn = get_db_connection()
-    if conn:
-        try:
-            query = """
-                SELECT * FROM kant.form_response_data 
-                WHERE "School ID" = %s AND DATE("Timestamp") = %s
-                ORDER BY "Timestamp" 
-            """
-            df = pd.read_sql(query, conn, params=(school_id, selected_date))
-            conn.close()
-
-            df['Timestamp'] = pd.to_datetime(df['Timestamp'])  # Convert to datetime if needed
-            df = df.sort_values(by='Timestamp', ascending=True)  # Ensure sorting
-            df = df.drop_duplicates(subset=['School ID', 'Class', 'Section'], keep='first')
-            return df
-        
-        except Exception as e:
-            st.error(f"Error fetching data: {e}")
-            return pd.DataFrame()
-    return pd.DataFrame()
+    return day_data.school_frame(fetch_day_data(selected_date), school_id)
 
 
 def calculate_school_priority(df):
@@ -158,8 +314,8 @@ def calculate_school_priority(df):
         timestamp = row['Timestamp']
     
 
-        if not os.path.exists(image_path):
-            continue  # Skip if image does not exist
+        if pd.isna(image_path) or not os.path.exists(image_path):
+            continue  # Skip if image is missing or does not exist
 
         filename = os.path.basename(image_path)
         file_size = round(os.path.getsize(image_path)/1024, 2)
@@ -240,11 +396,6 @@ def calculate_school_priority(df):
     return priority_scores
         
 
-def get_base64_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode()
-
-
 def check_misreporting(row):
     class_str = str(row["Class"]).strip()
     class_list = [int(cls.strip()) for cls in class_str.split(",") if cls.strip().isdigit()]
@@ -252,16 +403,8 @@ def check_misreporting(row):
     if not class_list:
         return False, "Invalid Class Data", []
 
-    films = []
-    for film_field in ["Film 1", "Film 2", "Film 3"]:
-        film_value = row.get(film_field, None)
-        if pd.isna(film_value):
-            films.append(0)
-        else:
-            try:
-                films.append(int(film_value))
-            except ValueError:
-                films.append(0)
+    # Film numbers are pre-parsed by day_data, <NA> for empty or invalid values
+    films = [0 if pd.isna(row[col]) else int(row[col]) for col in day_data.FILM_NUMBER_COLUMNS]
 
     issues_dict = {
         "too_old": [],
@@ -331,12 +474,20 @@ def add_to_suspect_list(row, issues):
             """
             cursor.execute(add_issues_column_query)
 
-            # Insert the record into suspect_list with issues column
-            insert_query = f"""
-            INSERT INTO kant.suspect_list ({', '.join(f'"{col}"' for col in row.index)}, "Issues") 
-            VALUES ({', '.join(['%s'] * len(row))}, %s)
+            # Insert the full record (the day data only keeps a few columns) with issues column
+            insert_query = """
+            INSERT INTO kant.suspect_list
+            SELECT f.*, %s FROM kant.form_response_data f
+            WHERE f."School ID" = %s AND f."Timestamp" = %s AND f."Class" IS NOT DISTINCT FROM %s AND f."Section" IS NOT DISTINCT FROM %s
+            LIMIT 1
             """
-            cursor.execute(insert_query, tuple(row) + (", ".join(issues) if issues else "",))
+            cursor.execute(insert_query, (
+                ", ".join(issues) if issues else "",
+                row["School ID"],
+                row["Timestamp"].to_pydatetime(),
+                row["Class"],
+                row["Section"],
+            ))
 
             # Remove duplicate records, keeping only the latest Timestamp per School ID
             remove_duplicates_query = """
@@ -356,7 +507,7 @@ def add_to_suspect_list(row, issues):
         except Exception as e:
             st.error(f"Error adding record to suspect list: {e}")
         finally:
-            conn.close()
+            release_db_connection(conn)
 
 
 from datetime import datetime
@@ -410,30 +561,42 @@ def remove_from_suspect_list(school_id, timestamp):
         except Exception as e:
             st.error(f"Error removing record from suspect list: {e}")
         finally:
-            conn.close()
+            release_db_connection(conn)
 
 
 
-# Fetch School Name based on School ID
-def get_school_name(school_id):
+# Load every school name at once, keyed by the School ID as text
+@shared_cache.shared_cache("school_names", SCHOOL_NAME_TTL)
+def query_school_names():
     conn = get_db_connection()
-    if conn:
-        try:
-            query = """
-                SELECT "SCHOOL" FROM kant."doe_school_list" 
-                WHERE "SCHOOL ID" = %s
-            """
+    if not conn:
+        raise ConnectionError("no database connection")
+    try:
+        query = """
+            SELECT "SCHOOL ID", "SCHOOL" FROM kant."doe_school_list" 
+        """
 
-            cursor = conn.cursor()
-            cursor.execute(query, (school_id,))
-            result = cursor.fetchone()
-            cursor.close()
-            conn.close()
-            return result[0] if result else "Unknown School"
-        except Exception as e:
-            st.error(f"Error fetching School Name: {e}")
-            return "Unknown School"
-    return "Unknown School"
+        cursor = conn.cursor()
+        cursor.execute(query)
+        names = {str(school_id): name for school_id, name in cursor.fetchall()}
+        cursor.close()
+        return names
+    finally:
+        release_db_connection(conn)
+
+
+@st.cache_resource(ttl=SCHOOL_NAME_TTL)
+def load_school_names():
+    return query_school_names()
+
+
+# Fetch School Name based on School ID
+def get_school_name(school_id):
+    try:
+        return load_school_names().get(str(school_id), "Unknown School")
+    except Exception as e:
+        st.error(f"Error fetching School Name: {e}")
+        return "Unknown School"
 
 
 
@@ -477,7 +640,35 @@ def extract_date_from_filename(basename):
 # selected_date = st.date_input("Select Date")
 
 
+# Serve originals and thumbnails next to the app, once per process
+@st.cache_resource
+def start_image_server():
+    if not image_server.IMAGE_SERVER_URL:
+        return None  # Nowhere published for browsers, tiles are inlined instead
+    try:
+        return image_server.start()
+    except OSError:
+        return None  # Port taken, another replica on this host already serves the images
+
+
+def warm_up():
+    """ Opens the DB pool, starts the image server and loads the school-name index before the first report is shown """
+    try:
+        start_image_server()
+        get_db_pool()
+        load_school_names()
+    except Exception:
+        pass  # Nothing is cached on failure, the report shows the error when it needs the DB
+
+
 def show():
+    st.markdown(PAGE_CSS, unsafe_allow_html=True)
+    start_image_server()
+    if not image_server.IMAGE_SERVER_URL:
+        st.error(
+            "IMAGE_SERVER_URL is not set, so originals cannot be opened and thumbnails are sent inline. "
+            "Publish the image server through the app's proxy and set IMAGE_SERVER_URL to its address."
+        )
 
     if "page" not in st.session_state:
         st.session_state.page = "home"  # Default page
@@ -503,22 +694,66 @@ def show():
     if 'current_index' not in st.session_state:
         st.session_state['current_index'] = 0
 
+    if 'school_order' not in st.session_state:
+        st.session_state['school_order'] = []
+    if 'max_index' not in st.session_state:
+        st.session_state['max_index'] = 0
+
     # Reset index when a new date is selected
     if selected_date != st.session_state['last_selected_date']:
         st.session_state['current_index'] = 0
         st.session_state['last_selected_date'] = selected_date
+        st.session_state['school_order'] = []
+        st.session_state['max_index'] = 0
+
+    # A school opened from the overview page is shown first, once
+    focus_school_id = st.session_state.pop("focus_school_id", None)
+    if focus_school_id is not None:
+        st.session_state['current_index'] = 0
+        st.session_state['max_index'] = 0
+        st.session_state['school_order'] = [focus_school_id]
 
     # Fetch school IDs for the selected date
     if selected_date:
-        school_ids = get_school_ids_for_date(selected_date)
+        with st.sidebar.expander("Memory usage"):
+            st.caption("Selected date")
+            st.dataframe(day_data.memory_report(fetch_day_data(selected_date)))
+            st.caption("All cached dates")
+            st.dataframe(day_data.cache_memory_report(cached_day_frames()))
+
+        ranking = None
+        if st.session_state.get("progressive_ranking", True):
+            try:
+                ranking = get_progressive_ranking(selected_date)
+            except Exception as e:
+                st.error(f"Error fetching School IDs: {e}")
+                ranking = ProgressiveRanking(selected_date, [], ranked=[])
+            # A school opened from the overview is shown at once, the ranking catches up behind it
+            if not st.session_state['school_order']:
+                with st.spinner("Ranking schools..."):
+                    ranking.first_ready.wait()
+
+            # A ranking that stopped early must not stay cached, the next run starts over
+            if ranking.error:
+                st.error(f"Error ranking schools: {ranking.error}")
+                get_progressive_ranking.clear(selected_date)
+            elif ranking.done and ranking.failed_schools:
+                st.warning(f"{len(ranking.failed_schools)} school(s) could not be scored and are listed last.")
+
+            # Schools the reviewer has already reached keep their position, even after PREV
+            st.session_state['max_index'] = max(st.session_state['max_index'], st.session_state['current_index'])
+            school_ids = ranking.navigation_order(st.session_state['school_order'], st.session_state['max_index'])
+            st.session_state['school_order'] = school_ids
+        else:
+            school_ids = get_school_ids_for_date(selected_date)
+            if focus_school_id in school_ids:
+                st.session_state['current_index'] = school_ids.index(focus_school_id)
 
         if school_ids:
 
 
-
-
             current_index = st.session_state['current_index']
-            total_schools = len(school_ids)
+            total_schools = ranking.total if ranking else len(school_ids)
             current_school_id = school_ids[current_index]
             school_name = get_school_name(current_school_id)
 
@@ -533,6 +768,8 @@ def show():
 
             with col3:
                 st.write(f"**{current_index + 1} / {total_schools}**")
+                if ranking and not ranking.done:
+                    st.caption(f"Ranking: {ranking.scored} / {total_schools} scored")
 
             with col4:
                 if st.button("PREV", key="prev") and st.session_state['current_index'] > 0:
@@ -540,9 +777,16 @@ def show():
                     st.rerun()
 
             with col5:
-                if st.button("NEXT", key="next") and st.session_state['current_index'] < len(school_ids) - 1:
-                    st.session_state['current_index'] += 1
-                    st.rerun()
+                if st.button("NEXT", key="next") and st.session_state['current_index'] < total_schools - 1:
+                    available = len(school_ids)
+                    # At the end of the scored schools, wait for the next one instead of ignoring the click
+                    if ranking and st.session_state['current_index'] >= available - 1:
+                        with st.spinner("Ranking schools..."):
+                            ranking.wait_for_scored(st.session_state['current_index'] + 2)
+                        available = ranking.scored
+                    if st.session_state['current_index'] < available - 1:
+                        st.session_state['current_index'] += 1
+                        st.rerun()
 
             # Fetch and display data for the current school ID
             data = fetch_data(current_school_id, selected_date)
@@ -590,10 +834,12 @@ def show():
 
                 for index, (i, row) in enumerate(data.iterrows()):
                     image_path = row["Class_pic"]
-                    image_path = os.path.abspath(os.path.normpath(image_path.strip()))
+                    image_path = "" if pd.isna(image_path) else os.path.abspath(os.path.normpath(image_path.strip()))
 
-                    if os.path.exists(image_path):
-                        base64_image = get_base64_image(image_path)  # comment this for st.image
+                    if image_path and os.path.exists(image_path):
+                        # The browser fetches the tile from the image server, the original only on click
+                        thumb_url, original_url = image_server.image_urls(selected_date, row["Class_pic"])
+                        link = f'href="{original_url}" target="_blank"' if original_url else ""
                         file_size = round(os.path.getsize(image_path) / 1024, 2)
                         # print(file_size)
 
@@ -626,8 +872,10 @@ def show():
                             st.markdown(
                                 f"""
                                 <div style="padding: 0px; {border_style}; text-align: center; display: inline-block;">
-                                <img src="data:image/jpeg;base64,{base64_image}" width="300" height="200" 
+                                <a {link}>
+                                <img src="{thumb_url}" width="300" height="200" loading="lazy"
                                 style="object-fit: cover; border-radius: 4px; display: block">
+                                </a>
                                 </div>
                                 """, unsafe_allow_html=True)
 
@@ -659,10 +907,12 @@ def show():
                                     style = "color: red;"
 
 
-                            films = [row['Film 1'], row['Film 2'], row['Film 3']]
+                            # Compare the parsed numbers check_misreporting used, show the values as uploaded
+                            films = [(row[field], row[col]) for field, col in zip(day_data.FILM_FIELDS, day_data.FILM_NUMBER_COLUMNS)]
                             formatted_films = [
-                                f'<span style="color: red;"><b>{film}</b></span>' if film in misreported_films else str(film)
-                                for film in films
+                                f'<span style="color: red;"><b>{film}</b></span>'
+                                if not pd.isna(number) and int(number) in misreported_films else str(film)
+                                for film, number in films
                             ]
                             film_display = ", ".join(formatted_films)
 
@@ -0,0 +1,179 @@
+import os
+import time
+import uuid
+import pickle
+import sqlite3
+import hashlib
+import functools
+import threading
+
+
+# Bump when the shape of any cached value changes, old entries are then ignored
+CACHE_VERSION = 3
+
+# sqlite:///path/to/file.sqlite3 (default) or redis://host:port/db
+CACHE_URL = os.getenv("KANT_CACHE_URL", "sqlite:///kant_cache.sqlite3")
+
+LOCK_TIMEOUT = 120  # Seconds one replica may spend computing a missing entry, unless its namespace says otherwise
+POLL_INTERVAL = 0.2  # Seconds between checks while another replica computes
+
+# Lock timeout of each namespace, set by shared_cache() so every caller of a namespace agrees
+lock_timeouts = {}
+
+
+class SQLiteBackend:
+    """ On-disk store shared by every process on the host """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)")
+        if "owner" not in [row[1] for row in conn.execute("PRAGMA table_info(locks)")]:
+            conn.execute("DROP TABLE IF EXISTS locks")  # Locks from before owners were recorded, all short-lived
+        conn.execute("CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, owner TEXT, expires_at REAL)")
+
+    def connection(self):
+        # sqlite3 connections cannot be shared between threads
+        if not hasattr(self.local, "conn"):
+            self.local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        return self.local.conn
+
+    def get(self, key):
+        row = self.connection().execute(
+            "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        conn = self.connection()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, sqlite3.Binary(value), now + ttl),
+        )
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+
+    def acquire(self, key, token, timeout):
+        conn = self.connection()
+        now = time.time()
+        conn.execute("DELETE FROM locks WHERE key = ? AND expires_at <= ?", (key, now))
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO locks (key, owner, expires_at) VALUES (?, ?, ?)", (key, token, now + timeout)
+        )
+        return cursor.rowcount == 1
+
+    def release(self, key, token):
+        self.connection().execute("DELETE FROM locks WHERE key = ? AND owner = ?", (key, token))
+
+
+class RedisBackend:
+    """ Store served by Redis or any server speaking its protocol """
+
+    # Deletes the lock only while it still belongs to the caller
+    RELEASE_SCRIPT = """
+        if redis.call("GET", KEYS[1]) == ARGV[1] then
+            return redis.call("DEL", KEYS[1])
+        end
+        return 0
+    """
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.release_script = self.client.register_script(self.RELEASE_SCRIPT)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=int(ttl))
+
+    def acquire(self, key, token, timeout):
+        return bool(self.client.set(f"lock:{key}", token, nx=True, px=int(timeout * 1000)))
+
+    def release(self, key, token):
+        self.release_script(keys=[f"lock:{key}"], args=[token])
+
+
+backend = None
+backend_lock = threading.Lock()
+
+
+def get_backend():
+    global backend
+    with backend_lock:
+        if backend is None:
+            if CACHE_URL.startswith("redis://"):
+                backend = RedisBackend(CACHE_URL)
+            else:
+                backend = SQLiteBackend(CACHE_URL.removeprefix("sqlite:///"))
+        return backend
+
+
+def make_key(namespace, args):
+    digest = hashlib.sha1(repr(args).encode()).hexdigest()
+    return f"kant:v{CACHE_VERSION}:{namespace}:{digest}"
+
+
+def peek(namespace, args):
+    """ Cached value or None, without computing anything """
+    value = get_backend().get(make_key(namespace, args))
+    return pickle.loads(value) if value is not None else None
+
+
+def put(namespace, args, value, ttl):
+    get_backend().set(make_key(namespace, args), pickle.dumps(value), ttl)
+
+
+def acquire(namespace, args):
+    """ Takes the single-flight lock of an entry, returns the owner token for release() or None """
+    token = uuid.uuid4().hex
+    if get_backend().acquire(make_key(namespace, args), token, lock_timeouts.get(namespace, LOCK_TIMEOUT)):
+        return token
+    return None
+
+
+def release(namespace, args, token):
+    """ Drops the lock unless it expired and another replica holds it now """
+    get_backend().release(make_key(namespace, args), token)
+
+
+def get_or_compute(namespace, args, compute, ttl):
+    """ Returns the cached value, letting only one replica compute it when missing """
+    store = get_backend()
+    key = make_key(namespace, args)
+
+    # A replica that dies or overruns its lock timeout loses the lock, the next poll takes over
+    while True:
+        value = store.get(key)
+        if value is not None:
+            return pickle.loads(value)
+
+        token = acquire(namespace, args)
+        if token:
+            try:
+                # Another replica may have filled the entry just before we got the lock
+                value = store.get(key)
+                if value is not None:
+                    return pickle.loads(value)
+                result = compute()
+                store.set(key, pickle.dumps(result), ttl)
+                return result
+            finally:
+                release(namespace, args, token)
+
+        time.sleep(POLL_INTERVAL)
+
+
+def shared_cache(namespace, ttl, lock_timeout=LOCK_TIMEOUT):
+    """ Caches a function's result across processes, exceptions are never cached """
+    lock_timeouts[namespace] = lock_timeout
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            return get_or_compute(namespace, args, lambda: func(*args), ttl)
+        return wrapper
+    return decorator
@@ -0,0 +1,56 @@
+import pandas as pd
+
+import day_data
+
+
+def raw_day(films):
+    return pd.DataFrame({
+        "School ID": ["1001"] * len(films),
+        "Timestamp": [f"2025-03-05 10:{i:02d}:00" for i in range(len(films))],
+        "Class": ["6"] * len(films),
+        "Section": [str(i) for i in range(len(films))],
+        "uploaded_by": ["Usha Kumari"] * len(films),
+        "Class_pic": [f"/photos/{i}.jpg" for i in range(len(films))],
+        "Film 1": films,
+        "Film 2": [None] * len(films),
+        "Film 3": [None] * len(films),
+    })
+
+
+def test_parse_film_numbers():
+    values = pd.Series(["61", " 72 ", None, "abc", "12.5", 63.0, "99999999999", "1e30"])
+    parsed = day_data.parse_film_numbers(values)
+
+    assert str(parsed.dtype) == "Int64"
+    assert parsed.tolist()[:2] == [61, 72]
+    assert parsed[2:5].isna().all()
+    assert parsed[5] == 63
+    assert parsed[6] == 99999999999
+    assert pd.isna(parsed[7])
+
+
+def test_out_of_range_film_keeps_the_day():
+    day = day_data.compact_day_frame(raw_day(["61", "99999999999"]))
+
+    assert day_data.school_ids(day) == ["1001"]
+    assert day_data.school_frame(day, "1001")["film_1"].tolist() == [61, 99999999999]
+
+
+def test_class_pic_stays_a_string_column():
+    day = day_data.compact_day_frame(raw_day(["61", "72"]))
+
+    assert pd.api.types.is_string_dtype(day["Class_pic"])
+    assert str(day["Film 1"].dtype) == "category"
+
+
+def test_cache_memory_report_covers_every_day():
+    days = {
+        "2025-03-06": day_data.compact_day_frame(raw_day(["61"])),
+        "2025-03-05": day_data.compact_day_frame(raw_day(["61", "72"])),
+    }
+    report = day_data.cache_memory_report(days)
+
+    assert list(report.index) == ["2025-03-05", "2025-03-06", "Total"]
+    assert report.loc["Total", "rows"] == 3
+    assert report.loc["Total", "KB"] == round(report["KB"][:2].sum(), 2)
+    assert day_data.cache_memory_report({}).loc["Total", "rows"] == 0
@@ -0,0 +1,63 @@
+import pytest
+
+import image_server
+import shared_cache
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_cache, "backend", shared_cache.SQLiteBackend(str(tmp_path / "cache.sqlite3")))
+    monkeypatch.setattr(image_server, "allowlists", {})
+    monkeypatch.setattr(image_server, "missing", {})
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=1000-", "invalid"),
+    ("bytes=50-10", "invalid"),
+    ("bytes=-0", "invalid"),
+    ("bytes=0-1,5-9", None),
+    ("items=0-99", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(header, expected):
+    assert image_server.parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"old", "abc"', True),
+    ("*", True),
+    ('"old"', False),
+])
+def test_matches(if_none_match, expected):
+    assert image_server.ImageHandler.matches(if_none_match, '"abc"') is expected
+
+
+def test_parse_day():
+    assert image_server.parse_day("2025-03-03") == "2025-03-03"
+    assert image_server.parse_day("yesterday") is None
+
+
+def test_allowlist_is_shared_between_replicas(monkeypatch):
+    image_server.allow("2025-03-03", ["/photos/a.jpg"])
+
+    # The serving replica never saw allow(), and must not need the database
+    monkeypatch.setattr(image_server, "allowlists", {})
+    monkeypatch.setattr(image_server, "query_referenced", lambda day, class_pic: pytest.fail("database asked"))
+    assert image_server.is_referenced("2025-03-03", "/photos/a.jpg")
+
+
+def test_unknown_paths_ask_the_database_once(monkeypatch):
+    lookups = []
+    monkeypatch.setattr(image_server, "query_referenced", lambda day, class_pic: lookups.append(class_pic) or False)
+
+    assert not image_server.is_referenced("2025-03-03", "/etc/passwd")
+    assert not image_server.is_referenced("2025-03-03", "/etc/passwd")
+    assert lookups == ["/etc/passwd"]
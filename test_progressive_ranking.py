@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+import report___2
+import shared_cache
+
+
+DAY = "2025-03-03"
+SCHOOL_IDS = [str(1000 + i) for i in range(12)]
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_cache, "backend", shared_cache.SQLiteBackend(str(tmp_path / "cache.sqlite3")))
+
+
+@pytest.fixture
+def scores(monkeypatch):
+    """ Priority per school, the first batch scores at once and the rest once `release` is set """
+    release = threading.Event()
+    priorities = {sid: 8 for sid in SCHOOL_IDS}
+
+    def score_school(school_id, selected_date):
+        if SCHOOL_IDS.index(school_id) >= 4:
+            release.wait(5)
+        priority = priorities[school_id]
+        if isinstance(priority, Exception):
+            raise priority
+        return priority
+
+    monkeypatch.setattr(report___2, "score_school", score_school)
+    return priorities, release
+
+
+def test_first_batch_sets_first_ready(scores):
+    priorities, release = scores
+    ranking = report___2.ProgressiveRanking(DAY, SCHOOL_IDS, batch_size=4)
+
+    assert ranking.first_ready.wait(5)
+    assert ranking.scored == 4 and not ranking.done
+
+    release.set()
+    ranking.thread.join(5)
+    assert ranking.done and ranking.scored == len(SCHOOL_IDS)
+
+
+def test_reached_schools_keep_their_position(scores):
+    priorities, release = scores
+    priorities.update({"1000": 6, "1001": 5, "1002": 7, "1011": 1, "1010": 2})
+    ranking = report___2.ProgressiveRanking(DAY, SCHOOL_IDS, batch_size=4)
+    ranking.first_ready.wait(5)
+
+    order = ranking.navigation_order([], 0)
+    assert order[:3] == ["1001", "1000", "1002"]
+
+    # The reviewer reached the third school, better schools scored later go after it
+    release.set()
+    ranking.thread.join(5)
+    merged = ranking.navigation_order(order, 2)
+    assert merged[:5] == ["1001", "1000", "1002", "1011", "1010"]
+    assert sorted(merged) == sorted(SCHOOL_IDS)
+
+
+def test_wait_for_scored_blocks_until_the_next_school(scores):
+    priorities, release = scores
+    ranking = report___2.ProgressiveRanking(DAY, SCHOOL_IDS, batch_size=4)
+    ranking.first_ready.wait(5)
+
+    waiter = threading.Thread(target=ranking.wait_for_scored, args=(5,))
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive()
+
+    release.set()
+    waiter.join(5)
+    assert not waiter.is_alive() and ranking.scored >= 5
+
+
+def test_failed_schools_are_last_and_not_published(scores):
+    priorities, release = scores
+    priorities["1000"] = ConnectionError("lost")
+    priorities["1005"] = ConnectionError("lost")
+    release.set()
+
+    ranking = report___2.ProgressiveRanking(DAY, SCHOOL_IDS, batch_size=4)
+    ranking.thread.join(5)
+
+    assert ranking.done and ranking.error is None
+    assert sorted(ranking.failed_schools) == ["1000", "1005"]
+    assert ranking.navigation_order([], -1)[-2:] == ["1000", "1005"]
+    assert shared_cache.peek("rankings", (DAY,)) is None
+
+
+def test_complete_ranking_is_published(scores):
+    priorities, release = scores
+    release.set()
+
+    ranking = report___2.ProgressiveRanking(DAY, SCHOOL_IDS, batch_size=4)
+    ranking.thread.join(5)
+
+    assert [sid for _, _, sid in shared_cache.peek("rankings", (DAY,))] == SCHOOL_IDS
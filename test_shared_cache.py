@@ -0,0 +1,89 @@
+import time
+import threading
+
+import pytest
+
+import shared_cache
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    backend = shared_cache.SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(shared_cache, "backend", backend)
+    return backend
+
+
+def test_lock_is_exclusive_until_released(store):
+    assert store.acquire("k", "a", 60)
+    assert not store.acquire("k", "b", 60)
+
+    store.release("k", "a")
+    assert store.acquire("k", "b", 60)
+
+
+def test_expired_lock_is_taken_over(store):
+    assert store.acquire("k", "a", 0.05)
+    time.sleep(0.1)
+
+    assert store.acquire("k", "b", 60)
+
+
+def test_stale_owner_cannot_release_the_new_lock(store):
+    assert store.acquire("k", "a", 0.05)
+    time.sleep(0.1)
+    assert store.acquire("k", "b", 60)
+
+    # The first holder finishes late, its release must leave b's lock alone
+    store.release("k", "a")
+    assert not store.acquire("k", "c", 60)
+
+
+def test_entries_expire_after_their_ttl(store):
+    store.set("k", b"value", 0.05)
+    assert store.get("k") == b"value"
+
+    time.sleep(0.1)
+    assert store.get("k") is None
+
+
+def test_namespace_lock_timeout(store, monkeypatch):
+    monkeypatch.setitem(shared_cache.lock_timeouts, "slow", 0.05)
+    token = shared_cache.acquire("slow", ("2025-03-03",))
+    assert token
+    assert shared_cache.acquire("slow", ("2025-03-03",)) is None
+
+    time.sleep(0.1)
+    assert shared_cache.acquire("slow", ("2025-03-03",))
+
+
+def test_get_or_compute_runs_once_across_callers(store):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.3)
+        return "ranked"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(shared_cache.get_or_compute("n", (1,), compute, 60)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["ranked"] * 4
+    assert len(calls) == 1
+
+
+def test_errors_are_not_cached(store):
+    @shared_cache.shared_cache("failing", 60)
+    def load(day):
+        raise ConnectionError("no database connection")
+
+    with pytest.raises(ConnectionError):
+        load("2025-03-03")
+    assert shared_cache.peek("failing", ("2025-03-03",)) is None
+    assert shared_cache.acquire("failing", ("2025-03-03",))